@@ -1,10 +1,16 @@
 import os
 import json
 import boto3
+import time
 import logging
 import requests
 from datetime import datetime
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
 from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import MaxRetryError, ResponseError
 from botocore.exceptions import ClientError
 
 #Variables stored in Jenkins
@@ -26,6 +32,123 @@ headers = {
     "Accept": "application/json",
     "Content-Type": "application/json"
 }
+jira_issue_url = f'{jira_url}/rest/api/3/issue'
+webex_messages_url = "https://webexapis.com/v1/messages"
+webex_headers = {
+    "Authorization": f"{webex_token}",
+    "Content-Type": "application/json"
+}
+
+# Session kept at module level so warm invocations reuse its connection pools
+session = requests.Session()
+# The session outlives invocations; refuse to store response cookies so no state carries over between them.
+# (requests still parses Set-Cookie headers, this only keeps the jar empty.)
+session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+#Log the total time of every upstream call, from sending the request until the final response headers are parsed.
+#The time includes any urllib3 retries and backoff sleeps, so the number of attempts is logged next to it.
+def log_response_timing(response, *args, **kwargs):
+    upstream = urlparse(response.url).hostname
+    elapsed_ms = response.elapsed.total_seconds() * 1000
+    response_retries = getattr(response.raw, 'retries', None)
+    attempts = len(response_retries.history) + 1 if response_retries else 1
+    logger.info(f"{upstream} responded with {response.status_code} in {elapsed_ms:.1f} ms total over {attempts} attempt(s)")
+
+#Jira and Webex both respond in UTF-8; default the encoding so response.text never falls back to charset detection
+def default_response_encoding(response, *args, **kwargs):
+    if response.encoding is None:
+        response.encoding = 'utf-8'
+
+# Registered before the templates are prepared, since they copy the session hooks
+session.hooks['response'].extend([log_response_timing, default_response_encoding])
+
+# Timeouts in seconds, plus the time kept in reserve for writing the logs to S3
+connect_timeout = 3.05
+read_timeout = 10
+log_upload_margin = 5
+
+# Pooled connections are only reused if the container was idle (frozen) for less than this many seconds.
+# NAT gateways and load balancers silently drop idle connections while the container is frozen,
+# and urllib3 cannot detect that before sending, so the first POST after a long freeze would get a reset.
+max_idle_seconds = 30
+last_invocation_end = None
+
+#Retry that gives up when the next backoff sleep plus a worst-case attempt would run past the invocation deadline
+class DeadlineRetry(Retry):
+    def __init__(self, *args, deadline=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadline = deadline
+
+    def new(self, **kw):
+        kw.setdefault('deadline', self.deadline)
+        return super().new(**kw)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if self.deadline is not None:
+            next_attempt_end = time.monotonic() + new_retry.get_backoff_time() + connect_timeout + read_timeout
+            if next_attempt_end > self.deadline:
+                raise MaxRetryError(_pool, url, error or ResponseError("not enough time left before the invocation deadline to retry"))
+        return new_retry
+
+# Retry failed connections and throttled (429/503) responses twice with a short backoff.
+# Read errors are not retried because the POST may already have created the ticket.
+# This knowingly includes 'Connection aborted.' resets on a reused keep-alive socket: urllib3 cannot tell
+# whether the request reached the server, so replaying it risks a duplicate ticket. Such resets are kept
+# rare by dropping pools after max_idle_seconds of idleness instead.
+# Retry-After is ignored so a long server-requested wait cannot outlast the invocation.
+retries = DeadlineRetry(
+    total=2,
+    read=False,
+    backoff_factor=0.5,
+    status_forcelist=[429, 503],
+    allowed_methods=["POST"],
+    respect_retry_after_header=False,
+    raise_on_status=False
+)
+https_adapter = HTTPAdapter(max_retries=retries)
+session.mount('https://', https_adapter)
+
+#Compute the deadline for upstream calls (keeping time for the S3 log upload) and hand it to the retries.
+#Pooled connections are dropped first if the container has been idle too long for them to be trusted.
+def set_invocation_deadline(context):
+    if last_invocation_end is not None and time.monotonic() - last_invocation_end > max_idle_seconds:
+        https_adapter.close()
+    deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - log_upload_margin
+    https_adapter.max_retries = retries.new(deadline=deadline)
+    return deadline
+
+#Compute a (connect, read) timeout bounded by the deadline, or None when there is no time left to send a request
+def request_timeout(deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+#Record when the upstream calls of an invocation finished, to measure how long the pooled connections sat idle
+def mark_invocation_end():
+    global last_invocation_end
+    last_invocation_end = time.monotonic()
+
+#Prepare a POST once (URL parsing, header merge, auth) so each send only substitutes the body.
+def prepare_request_template(url, headers, auth=None):
+    return session.prepare_request(requests.Request('POST', url, headers=headers, auth=auth))
+
+#Copy the template and attach the body
+def prepare_from_template(template, body):
+    prepared_request = template.copy()
+    prepared_request.prepare_body(body, None)
+    return prepared_request
+
+#Resolve proxies and verify/CA bundle from the environment once per upstream.
+#Passing them to session.send keeps REQUESTS_CA_BUNDLE/proxy settings honoured without re-reading the environment per call.
+def resolve_send_settings(url):
+    return session.merge_environment_settings(url, {}, None, None, None)
+
+jira_request_template = prepare_request_template(jira_issue_url, headers, auth)
+webex_request_template = prepare_request_template(webex_messages_url, webex_headers)
+jira_send_settings = resolve_send_settings(jira_issue_url)
+webex_send_settings = resolve_send_settings(webex_messages_url)
 
 #Custom logging handler stores logs in memory and writes them to an S3 bucket at the end of the invocation.
 class S3LogHandler(logging.Handler):
@@ -78,15 +201,14 @@ logger.setLevel(logging.INFO)
 s3_log_handler = S3LogHandler()
 logger.addHandler(s3_log_handler)
 
-#Create a Jira ticket using the provided payload, authentication, and headers
-def create_jira_ticket(jira_payload, auth, headers): 
+#Create a Jira ticket using the provided payload and the prepared Jira request template
+def create_jira_ticket(jira_payload, deadline): 
+    timeout = request_timeout(deadline)
+    if timeout is None:
+        logger.error("Skipping Jira ticket creation: no time left before the invocation deadline")
+        return None, None
     try:
-        response = requests.post(
-            f'{jira_url}/rest/api/3/issue',
-            auth=auth,
-            data=jira_payload,
-            headers=headers
-        )
+        response = session.send(prepare_from_template(jira_request_template, jira_payload), timeout=timeout, **jira_send_settings)
         if response.status_code == 201:
             logger.info("Jira ticket created successfully")
             jira_ticket_data = response.json()
@@ -96,22 +218,25 @@ def create_jira_ticket(jira_payload, auth, headers):
             return jira_ticket_id, jira_ticket_url
         else:
             logger.error(f"Failed to create Jira ticket. Status Code: {response.status_code}, Response: {response.text}")
-            return None
+            return None, None
     except requests.exceptions.RequestException as e:
         logger.error(f"Error creating Jira ticket: {e}")
-        return None
+        return None, None
                 
-def send_webex_message(incident_message):
-    url = "https://webexapis.com/v1/messages"
-    headers = {
-        "Authorization": f"{webex_token}",
-        "Content-Type": "application/json"
-    }
+def send_webex_message(incident_message, deadline):
+    timeout = request_timeout(deadline)
+    if timeout is None:
+        logger.error("Skipping Webex message: no time left before the invocation deadline")
+        return
     payload = {
         "roomId": webex_space_id,
         "text": incident_message
     }
-    response = requests.post(url, data=json.dumps(payload), headers=headers)
+    try:
+        response = session.send(prepare_from_template(webex_request_template, json.dumps(payload)), timeout=timeout, **webex_send_settings)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error sending Webex message: {e}")
+        return
 
     if response.status_code == 200:
         logger.info("Webex POST request successful")
@@ -144,18 +269,24 @@ def lambda_handler(event, context):
         s3_log_handler.write_logs_to_s3()
         return f"Invalid payload: Missing key {e}"
              
+    # Upstream calls (including retries) must finish before this deadline so the logs can still be written to S3
+    deadline = set_invocation_deadline(context)
+
     # Create the Jira payload by passing necessary parameters
     jira_payload = create_jira_payload(incident_id, incident_summary, incident_url, jira_issue, jira_id)
 
     # Call the create_jira_ticket function to create a Jira ticket and returns the ticket ID and the ticket URL
-    incident_jira_ticket_id, incident_jira_ticket_url = create_jira_ticket(jira_payload, auth, headers)
+    incident_jira_ticket_id, incident_jira_ticket_url = create_jira_ticket(jira_payload, deadline)
 
     # Check if the Jira ticket was created successfully by verifying if the incident_jira_ticket_id is not None
     if incident_jira_ticket_id:
         logger.info(f"Jira ticket URL: {incident_jira_ticket_url}")
 
         # Send the Jira ticket URL as a Webex message
-        send_webex_message(incident_jira_ticket_url)
+        send_webex_message(incident_jira_ticket_url, deadline)
+
+    # Remember when the upstream calls finished, so the next invocation can tell how long the connections sat idle
+    mark_invocation_end()
     
     # Write logs to the S3 bucket
     s3_log_handler.write_logs_to_s3()